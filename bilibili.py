@@ -1,5 +1,7 @@
 import os
+import time
 from datetime import datetime
+from enum import IntEnum
 from typing import Optional
 
 import aiohttp
@@ -8,8 +10,28 @@ from astrbot.api import logger
 from .templates import MessageTemplates
 
 
+class LiveState(IntEnum):
+    """直播间状态，取值与接口返回的 live_status 一致"""
+    OFFLINE = 0
+    LIVE = 1
+    ROTATION = 2  # 轮播
+
+    @classmethod
+    def from_status(cls, live_status) -> "LiveState":
+        try:
+            return cls(int(live_status))
+        except (ValueError, TypeError):
+            return cls.OFFLINE
+
+
 class BilibiliLiveRoom:
     _session: aiohttp.ClientSession = None
+    # 流量记录（全局），见 replay.py
+    _recorder = None
+
+    # 状态切换确认参数：连续读取次数与下播宽限期(秒)
+    confirm_reads: int = 1
+    offline_grace: float = 0
 
     @classmethod
     async def get_session(cls):
@@ -29,37 +51,81 @@ class BilibiliLiveRoom:
             except Exception as e:
                 logger.error(f"关闭会话失败: {str(e)}")
 
+    @classmethod
+    def set_recorder(cls, recorder):
+        if cls._recorder is not None and cls._recorder is not recorder:
+            cls._recorder.close()
+        cls._recorder = recorder
+
+    def attach_replayer(self, replayer, clock):
+        """让该实例的请求改由轨迹回放提供，并以 clock 作为状态机时钟；只影响当前实例"""
+        self._replayer = replayer
+        self._clock = clock
+
+    @classmethod
+    def configure(cls, confirm_reads: int = 1, offline_grace: float = 0):
+        cls.confirm_reads = max(1, int(confirm_reads))
+        cls.offline_grace = max(0.0, float(offline_grace))
+
+    async def _request(self, kind: str, url: str, timeout: int, as_json: bool = True):
+        """发起请求；开启回放时直接返回轨迹中的响应，开启记录时写入原始响应"""
+        if self._replayer is not None:
+            return await self._replayer.take(kind, self.room_id)
+
+        started = time.perf_counter()
+        try:
+            session = await self.get_session()
+            async with session.get(url, timeout=timeout) as resp:
+                if as_json:
+                    data = await resp.json()
+                else:
+                    resp.raise_for_status()
+                    data = await resp.read()
+        except Exception as e:
+            if self._recorder is not None:
+                self._recorder.record(kind, self.room_id, elapsed=time.perf_counter() - started, error=str(e))
+            raise
+
+        if self._recorder is not None:
+            self._recorder.record(kind, self.room_id, data, elapsed=time.perf_counter() - started)
+        return data
+
     def __init__(self, room_id: int, anchor_name: str):
         self.room_id = int(room_id)
         self.anchor_name = str(anchor_name)
+        self._replayer = None
+        self._clock = time.monotonic
+        self.state: Optional[LiveState] = None
         self.last_status = None
+        self._pending_live: Optional[bool] = None
+        self._pending_count = 0
+        self._pending_since: Optional[float] = None
         self.last_check_time = None
         self.live_start_time = None
         self.has_sent_live_notice = False
         self.room_title = "无标题"
         self.room_url = f"https://live.bilibili.com/{room_id}"
         self.cover_url = ""
+        # 已下载到本地的封面对应的 cover_url，封面变化时失效
+        self._cover_cache_url = ""
+        self._has_room_meta = False
 
     async def _get_room_init(self):
         try:
-            session = await self.get_session()
             url = f"https://api.live.bilibili.com/room/v1/Room/room_init?id={self.room_id}"
-            async with session.get(url, timeout=10) as resp:
-                data = await resp.json()
-                if data.get('code') == 0:
-                    return data['data']
+            data = await self._request("room_init", url, timeout=10)
+            if data.get('code') == 0:
+                return data['data']
         except Exception as e:
             logger.error(f"获取直播间{self.room_id}基础信息失败: {str(e)}")
         return None
 
     async def _get_room_info(self):
         try:
-            session = await self.get_session()
             url = f"https://api.live.bilibili.com/room/v1/Room/get_info?room_id={self.room_id}"
-            async with session.get(url, timeout=10) as resp:
-                data = await resp.json()
-                if data.get('code') == 0:
-                    return data['data']
+            data = await self._request("room_info", url, timeout=10)
+            if data.get('code') == 0:
+                return data['data']
         except Exception as e:
             logger.error(f"获取直播间{self.room_id}详细信息失败: {str(e)}")
         return None
@@ -75,21 +141,48 @@ class BilibiliLiveRoom:
             live_status = init_data.get('live_status', 0)
             live_time: int = init_data.get('live_time')
 
+            old_title = self.room_title
+            title_changed, cover_changed = False, False
             if room_data:
-                self.room_title = room_data.get('title', '无标题')
-                self.cover_url = room_data.get('user_cover', '')
+                title_changed, cover_changed = self._update_room_meta(
+                    room_data.get('title', '无标题'),
+                    room_data.get('user_cover', '')
+                )
 
             is_new_live, is_new_offline = self._update_status(live_status, live_time)
             return {
                 "is_new_live": is_new_live,
                 "is_new_offline": is_new_offline,
-                "current_status": live_status
+                "current_status": live_status,
+                "title_changed": title_changed,
+                "cover_changed": cover_changed,
+                "old_title": old_title
             }
         except Exception as e:
             logger.error(f"更新直播间{self.room_id}信息失败: {str(e)}")
         return None
 
+    def _update_room_meta(self, title: str, cover_url: str) -> tuple[bool, bool]:
+        # 首次获取信息时只记录，不视为变化
+        is_first = not self._has_room_meta
+        self._has_room_meta = True
+
+        title_changed = title != self.room_title
+        cover_changed = cover_url != self.cover_url
+        if not (title_changed or cover_changed):
+            return False, False
+
+        self.room_title = title
+        self.cover_url = cover_url
+        if cover_changed:
+            self._cover_cache_url = ""
+
+        if is_first:
+            return False, False
+        return title_changed, cover_changed
+
     async def download_cover(self):
+        """下载封面到 covers/<房间号>.jpg，封面未变化且文件仍在时直接复用"""
         if not self.cover_url:
             return None
         save_dir = "covers"
@@ -97,12 +190,14 @@ class BilibiliLiveRoom:
         os.makedirs(save_dir, exist_ok=True)
         save_path = os.path.join(save_dir, new_name)
 
+        if self._cover_cache_url == self.cover_url and os.path.exists(save_path):
+            return save_path
+
         try:
-            session = await self.get_session()
-            async with session.get(self.cover_url, timeout=15) as resp:
-                resp.raise_for_status()
-                with open(save_path, 'wb') as f:
-                    f.write(await resp.read())
+            data = await self._request("cover", self.cover_url, timeout=15, as_json=False)
+            with open(save_path, 'wb') as f:
+                f.write(data)
+            self._cover_cache_url = self.cover_url
             return save_path
         except Exception as e:
             logger.error(f"异步下载直播间{self.room_id}封面失败: {str(e)}")
@@ -110,31 +205,61 @@ class BilibiliLiveRoom:
 
     def _update_status(self, current_status, live_time: int):
         self.last_check_time = datetime.now()
+        observed = LiveState.from_status(current_status)
 
-        is_new_live = False
-        is_new_offline = False
-
-        if self.last_status is None:
-            self.last_status = current_status
-            if current_status == 1:
+        if self.state is None:
+            self._set_state(observed)
+            if observed == LiveState.LIVE:
                 self._parse_live_time(live_time)
                 self.has_sent_live_notice = True
             else:
                 self.has_sent_live_notice = False
             return False, False
 
-        if current_status != self.last_status:
-            self.last_status = current_status
-            if current_status == 1:
-                if not self.has_sent_live_notice:
-                    self._parse_live_time(live_time)
-                    is_new_live = True
-            else:
-                self.has_sent_live_notice = False
-                self.live_start_time = None
-                is_new_offline = True
+        if observed == self.state:
+            self._reset_pending()
+            return False, False
+
+        # 未开播与轮播之间的切换不涉及开播/下播，直接接受
+        if self.state != LiveState.LIVE and observed != LiveState.LIVE:
+            self._set_state(observed)
+            self._reset_pending()
+            return False, False
+
+        # 开播/下播需要连续多次读取确认，下播还需经过宽限期
+        observed_live = observed == LiveState.LIVE
+        now = self._clock()
+        if self._pending_live != observed_live:
+            self._pending_live = observed_live
+            self._pending_count = 0
+            self._pending_since = now
+        self._pending_count += 1
+
+        if self._pending_count < self.confirm_reads:
+            return False, False
+        if not observed_live and now - self._pending_since < self.offline_grace:
+            return False, False
+
+        self._reset_pending()
+        self._set_state(observed)
+        if observed_live:
+            if not self.has_sent_live_notice:
+                self._parse_live_time(live_time)
+                return True, False
+            return False, False
+
+        self.has_sent_live_notice = False
+        self.live_start_time = None
+        return False, True
+
+    def _set_state(self, state: "LiveState"):
+        self.state = state
+        self.last_status = int(state)
 
-        return is_new_live, is_new_offline
+    def _reset_pending(self):
+        self._pending_live = None
+        self._pending_count = 0
+        self._pending_since = None
 
     def _parse_live_time(self, live_time):
         if not live_time:
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+from astrbot.api import logger
+
+
+class LiveEventConsumer:
+    """单个下游消费者的有界缓冲区，缓冲区满时丢弃最旧的事件"""
+
+    def __init__(self, name: str, buffer_size: int):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, buffer_size))
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        if self.queue.full():
+            # 慢消费者只丢自己的旧事件，不会阻塞监控主循环
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+            if self.dropped % 100 == 1:
+                logger.warning(f"事件消费者 {self.name} 处理过慢，已累计丢弃 {self.dropped} 条事件")
+        self.queue.put_nowait(event)
+
+    async def get_batch(self, max_items: int, timeout: Optional[float],
+                        stop: Optional[asyncio.Event] = None) -> list[dict]:
+        """等待至多 timeout 秒取得第一条事件，随后尽量取满一批；stop 被设置时立即返回空批次"""
+        get_task = asyncio.ensure_future(self.queue.get())
+        waiters = {get_task}
+        if stop is not None:
+            waiters.add(asyncio.ensure_future(stop.wait()))
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.cancel()
+        if get_task not in done:
+            return []
+        batch = [get_task.result()]
+        while len(batch) < max_items and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+
+class LiveEventHub:
+    """开播/下播事件的本地分发中心，供 webhook / SSE / Unix socket 输出复用"""
+
+    def __init__(self, buffer_size: int = 256):
+        self.buffer_size = buffer_size
+        self.consumers: set[LiveEventConsumer] = set()
+
+    def subscribe(self, name: str) -> LiveEventConsumer:
+        consumer = LiveEventConsumer(name, self.buffer_size)
+        self.consumers.add(consumer)
+        logger.debug(f"事件消费者 {name} 已连接")
+        return consumer
+
+    def unsubscribe(self, consumer: LiveEventConsumer):
+        self.consumers.discard(consumer)
+        logger.debug(f"事件消费者 {consumer.name} 已断开")
+
+    def publish(self, event_type: str, **fields):
+        if not self.consumers:
+            return
+        event = {"type": event_type, "timestamp": int(datetime.now().timestamp()), **fields}
+        for consumer in list(self.consumers):
+            consumer.offer(event)
+
+
+class WebhookOutput:
+    """将事件按批次 POST 到指定 URL"""
+
+    def __init__(self, hub: LiveEventHub, url: str, batch_interval: float, batch_size: int = 50):
+        self.hub = hub
+        self.url = url
+        self.batch_interval = max(0.1, batch_interval)
+        self.batch_size = batch_size
+        self._consumer: Optional[LiveEventConsumer] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._consumer = self.hub.subscribe(f"webhook:{self.url}")
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"事件 webhook 输出已启动: {self.url}")
+
+    async def _run(self):
+        async with aiohttp.ClientSession() as session:
+            while True:
+                batch = await self._consumer.get_batch(self.batch_size, self.batch_interval)
+                if not batch:
+                    continue
+                try:
+                    async with session.post(self.url, json={"events": batch}, timeout=10) as resp:
+                        if resp.status >= 400:
+                            logger.error(f"事件 webhook 返回错误状态 {resp.status}，丢弃 {len(batch)} 条事件")
+                except Exception as e:
+                    logger.error(f"事件 webhook 推送失败，丢弃 {len(batch)} 条事件: {str(e)}")
+                # 攒批：两次推送之间至少间隔 batch_interval
+                await asyncio.sleep(self.batch_interval)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._consumer:
+            self.hub.unsubscribe(self._consumer)
+
+
+class SSEOutput:
+    """通过 HTTP Server-Sent Events 推送事件，路径为 /events"""
+
+    HEARTBEAT_INTERVAL = 15
+    SHUTDOWN_TIMEOUT = 2
+
+    def __init__(self, hub: LiveEventHub, host: str, port: int):
+        self.hub = hub
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+        self._stopping = asyncio.Event()
+        # 已打开的响应及其连接，stop() 时主动断开
+        self._responses: dict[web.StreamResponse, asyncio.Transport] = {}
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/events", self._handle)
+        self._runner = web.AppRunner(app, shutdown_timeout=self.SHUTDOWN_TIMEOUT)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"事件 SSE 输出已启动: http://{self.host}:{self.port}/events")
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        resp = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await resp.prepare(request)
+        consumer = self.hub.subscribe(f"sse:{request.remote}")
+        self._responses[resp] = request.transport
+        try:
+            while not self._stopping.is_set():
+                batch = await consumer.get_batch(50, self.HEARTBEAT_INTERVAL, self._stopping)
+                if self._stopping.is_set():
+                    break
+                if not batch:
+                    await resp.write(b": keepalive\n\n")
+                    continue
+                payload = "".join(
+                    f"event: {e['type']}\ndata: {json.dumps(e, ensure_ascii=False)}\n\n" for e in batch
+                )
+                await resp.write(payload.encode("utf-8"))
+        except ConnectionResetError:
+            pass
+        finally:
+            self._responses.pop(resp, None)
+            self.hub.unsubscribe(consumer)
+        return resp
+
+    async def stop(self):
+        self._stopping.set()
+        for resp, transport in list(self._responses.items()):
+            resp.force_close()
+            if transport is not None:
+                transport.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class UnixSocketOutput:
+    """通过 Unix socket 以 JSON Lines 格式推送事件"""
+
+    def __init__(self, hub: LiveEventHub, path: str):
+        self.hub = hub
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        # 每个客户端连接对应一个关闭事件，客户端断开或 stop() 时被设置
+        self._connections: dict[asyncio.StreamWriter, asyncio.Event] = {}
+        self._handlers: set[asyncio.Task] = set()
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        logger.info(f"事件 Unix socket 输出已启动: {self.path}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        consumer = self.hub.subscribe(f"unix:{id(writer)}")
+        closed = asyncio.Event()
+        self._connections[writer] = closed
+        self._handlers.add(asyncio.current_task())
+        # 持续读取并丢弃客户端发来的数据，以便及时发现断开
+        reader_task = asyncio.create_task(self._drain_reader(reader, closed))
+        try:
+            while not closed.is_set():
+                batch = await consumer.get_batch(50, None, closed)
+                if not batch:
+                    continue
+                writer.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch).encode("utf-8"))
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            reader_task.cancel()
+            self._connections.pop(writer, None)
+            self._handlers.discard(asyncio.current_task())
+            self.hub.unsubscribe(consumer)
+            writer.close()
+
+    @staticmethod
+    async def _drain_reader(reader: asyncio.StreamReader, closed: asyncio.Event):
+        try:
+            while await reader.read(4096):
+                pass
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            closed.set()
+
+    async def stop(self):
+        # Python 3.12.1 起 wait_closed() 会等待所有客户端连接关闭，需先主动断开
+        for writer, closed in list(self._connections.items()):
+            closed.set()
+            writer.close()
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.remove(self.path)
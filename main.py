@@ -6,11 +6,13 @@ from typing import Optional
 import yaml
 from astrbot.api import AstrBotConfig
 from astrbot.api import logger
-from astrbot.api.event import MessageChain
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 
 from .bilibili import BilibiliLiveRoom
+from .event_stream import LiveEventHub, WebhookOutput, SSEOutput, UnixSocketOutput
+from .payload import NotificationPayload, BASE64_IMAGE_PLATFORMS
+from .replay import TrafficRecorder
 from .templates import MessageTemplates
 
 
@@ -54,10 +56,67 @@ class BilibiliLiveMonitor(Star):
         except (ValueError, TypeError):
             self.check_interval = 60
 
+        try:
+            BilibiliLiveRoom.configure(
+                confirm_reads=int(config.get("live_confirm_reads", 1)),
+                offline_grace=float(config.get("offline_grace", 0))
+            )
+        except (ValueError, TypeError):
+            BilibiliLiveRoom.configure()
+
         # 集中管理模板配置
         MessageTemplates.update_templates(config)
         self.running = True
 
+        try:
+            event_buffer_size = int(config.get("event_buffer_size", 256) or 256)
+        except (ValueError, TypeError):
+            event_buffer_size = 256
+        self.event_hub = LiveEventHub(event_buffer_size)
+        self.event_outputs = []
+        if config.get("event_webhook_url"):
+            try:
+                webhook_interval = float(config.get("event_webhook_interval", 5) or 5)
+            except (ValueError, TypeError):
+                webhook_interval = 5
+            self.event_outputs.append(WebhookOutput(
+                self.event_hub,
+                config.get("event_webhook_url"),
+                webhook_interval
+            ))
+        try:
+            sse_port = int(config.get("event_sse_port", 0) or 0)
+        except (ValueError, TypeError):
+            logger.error(f"事件 SSE 端口配置无效: {config.get('event_sse_port')}，已关闭 SSE 输出")
+            sse_port = 0
+        if sse_port:
+            self.event_outputs.append(SSEOutput(
+                self.event_hub,
+                config.get("event_sse_host", "127.0.0.1") or "127.0.0.1",
+                sse_port
+            ))
+        if config.get("event_unix_socket"):
+            self.event_outputs.append(UnixSocketOutput(self.event_hub, config.get("event_unix_socket")))
+
+        if config.get("traffic_record_path"):
+            try:
+                BilibiliLiveRoom.set_recorder(TrafficRecorder(config.get("traffic_record_path")))
+            except Exception as e:
+                logger.error(f"开启B站接口流量记录失败: {str(e)}")
+
+        # 同一轮（或合并窗口内）的开播/下播通知按会话合并发送
+        self.digest_enable = bool(config.get("digest_enable", False))
+        try:
+            self.digest_window = int(config.get("digest_window", 0))
+        except (ValueError, TypeError):
+            self.digest_window = 0
+        self._digest_pending: dict[str, list[dict]] = {}
+        self._digest_flush_task: Optional[asyncio.Task] = None
+        self._cycle_running = False
+        self._monitor_task: Optional[asyncio.Task] = None
+        # 终止时唤醒仍在等待合并窗口的发送任务
+        self._digest_wake = asyncio.Event()
+
     async def _get_subs(self) -> dict:
         subs = await self.get_kv_data("subs", {})
         # {"sids": [], "anchor_name": anchor_name}
@@ -72,7 +131,135 @@ class BilibiliLiveMonitor(Star):
         for live_id, data in subs.items():
             self.rooms[live_id] = BilibiliLiveRoom(live_id, data.get("anchor_name", str(live_id)))
 
-        asyncio.create_task(self.monitor_task())
+        for output in self.event_outputs:
+            try:
+                await output.start()
+            except Exception as e:
+                logger.error(f"启动事件输出 {type(output).__name__} 失败: {str(e)}")
+
+        self._monitor_task = asyncio.create_task(self.monitor_task())
+
+    @staticmethod
+    def _room_snapshot(room: BilibiliLiveRoom) -> dict:
+        return {
+            "anchor_name": room.anchor_name,
+            "room_title": room.room_title,
+            "room_url": room.room_url,
+            "room_id": room.room_id
+        }
+
+    def _build_live_start_payload(self, snapshot: dict, cover_path: Optional[str]) -> NotificationPayload:
+        msg_text = MessageTemplates.msg_live_start.render(
+            anchor_name=snapshot["anchor_name"],
+            room_title=snapshot["room_title"],
+            room_url=snapshot["room_url"],
+            room_id=snapshot["room_id"]
+        )
+
+        return NotificationPayload(
+            msg_text,
+            cover_path=cover_path,
+            cover_fail_text=MessageTemplates.msg_cover_fail.render()
+        )
+
+    def _build_live_end_payload(self, snapshot: dict) -> NotificationPayload:
+        msg_text = MessageTemplates.msg_live_end.render(
+            anchor_name=snapshot["anchor_name"],
+            room_id=snapshot["room_id"]
+        )
+        return NotificationPayload(msg_text)
+
+    def _platform_uses_base64(self, sid: str) -> bool:
+        # unified_msg_origin 形如 "平台ID:消息类型:会话ID"
+        if ":" not in sid:
+            return False
+        try:
+            platform = self.context.get_platform_inst(sid.split(":", 1)[0])
+            return platform is not None and platform.meta().name in BASE64_IMAGE_PLATFORMS
+        except Exception as e:
+            logger.debug(f"获取会话 {sid} 所属平台失败: {e}")
+            return False
+
+    async def _send_to_sids(self, sids: list, payload: NotificationPayload, notice_name: str):
+        for sid in sids:
+            try:
+                message = payload.chain_for(self._platform_uses_base64(sid))
+                logger.debug(message.get_plain_text(True))
+                await self.context.send_message(sid, message)
+                logger.info(f"已向会话 {sid} 发送 {notice_name}")
+            except Exception as e:
+                logger.error(f"向会话 {sid} 发送 {notice_name} 失败: {e}")
+
+    async def _queue_digest(self, sids: list, kind: str, room: BilibiliLiveRoom):
+        if not sids:
+            return
+        # 入队时固定直播间信息与封面，发送时不再读取可能已变化的房间状态
+        entry = {"kind": kind, **self._room_snapshot(room)}
+        if kind == "live":
+            entry["cover_path"] = await room.download_cover()
+        for sid in sids:
+            self._digest_pending.setdefault(sid, []).append(entry)
+
+        if self.digest_window > 0 and self._digest_pending and (
+                self._digest_flush_task is None or self._digest_flush_task.done()):
+            self._digest_flush_task = asyncio.create_task(self._flush_digest_later())
+
+    async def _flush_digest_later(self):
+        try:
+            await asyncio.wait_for(self._digest_wake.wait(), timeout=self.digest_window)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await self._flush_digest()
+        except Exception as e:
+            logger.error(f"发送汇总通知出错: {str(e)}")
+
+    async def _end_digest_cycle(self):
+        """未设置合并窗口时，每轮检查结束即发送本轮汇总"""
+        if self.digest_enable and self.digest_window <= 0:
+            await self._flush_digest()
+
+    async def _end_digest_outside_cycle(self):
+        """非监控轮次（如 /live_info）检测到的变化：监控轮次进行中时随该轮一起发送，否则立即发送"""
+        if not self._cycle_running:
+            await self._end_digest_cycle()
+
+    async def _flush_digest(self):
+        pending, self._digest_pending = self._digest_pending, {}
+        # 同一直播间在本次汇总中只构建一次单条消息
+        single_payloads = {}
+
+        for sid, entries in pending.items():
+            if len(entries) == 1:
+                entry = entries[0]
+                key = (entry["kind"], entry["room_id"])
+                if key not in single_payloads:
+                    if entry["kind"] == "live":
+                        single_payloads[key] = self._build_live_start_payload(entry, entry.get("cover_path"))
+                    else:
+                        single_payloads[key] = self._build_live_end_payload(entry)
+                notice_type = "开播通知" if entry["kind"] == "live" else "下播通知"
+                await self._send_to_sids([sid], single_payloads[key], f"{entry['anchor_name']} {notice_type}")
+                continue
+
+            msg_text = MessageTemplates.msg_live_digest_header.render(count=len(entries))
+            for entry in entries:
+                if entry["kind"] == "live":
+                    msg_text += MessageTemplates.msg_live_digest_live_item.render(
+                        anchor_name=entry["anchor_name"],
+                        room_title=entry["room_title"],
+                        room_url=entry["room_url"],
+                        room_id=entry["room_id"]
+                    )
+                else:
+                    msg_text += MessageTemplates.msg_live_digest_end_item.render(
+                        anchor_name=entry["anchor_name"],
+                        room_id=entry["room_id"]
+                    )
+            await self._send_to_sids([sid], NotificationPayload(msg_text), f"{len(entries)} 条开播/下播汇总通知")
+
+        if pending:
+            logger.info(f"已向 {len(pending)} 个会话发送开播/下播汇总通知")
 
     async def update_and_notify_room(self, room_id: int, room: BilibiliLiveRoom) -> Optional[dict]:
         result = await room.update_info()
@@ -80,66 +267,87 @@ class BilibiliLiveMonitor(Star):
             return None
 
         if result["is_new_live"]:
-            save_path = await room.download_cover()
-
-            msg_text = MessageTemplates.msg_live_start.render(
+            self.event_hub.publish(
+                "live_start",
+                room_id=room.room_id,
                 anchor_name=room.anchor_name,
                 room_title=room.room_title,
                 room_url=room.room_url,
-                room_id=room.room_id
+                cover_url=room.cover_url
             )
 
-            message = MessageChain().message(msg_text)
-            if save_path and os.path.exists(save_path):
-                message.file_image(save_path)
-            else:
-                message.message(MessageTemplates.msg_cover_fail.render())
-
             subs = await self._get_subs()
             sids = subs.get(room_id, {}).get("sids", [])
 
-            for sid in sids:
-                try:
-                    logger.debug(message.get_plain_text(True))
-                    await self.context.send_message(sid, message)
-                    logger.info(f"已向会话 {sid} 发送 {room.anchor_name} 开播通知")
-                except Exception as e:
-                    logger.error(f"向会话 {sid} 发送开播通知失败: {e}")
-
             room.has_sent_live_notice = True
-            logger.info(f"直播间{room_id}({room.anchor_name})开播，已发送通知")
+            if self.digest_enable:
+                await self._queue_digest(sids, "live", room)
+                logger.info(f"直播间{room_id}({room.anchor_name})开播，通知已加入汇总队列")
+            else:
+                payload = self._build_live_start_payload(self._room_snapshot(room), await room.download_cover())
+                await self._send_to_sids(sids, payload, f"{room.anchor_name} 开播通知")
+                logger.info(f"直播间{room_id}({room.anchor_name})开播，已发送通知")
 
         elif result["is_new_offline"]:
-            msg_text = MessageTemplates.msg_live_end.render(
+            self.event_hub.publish(
+                "live_end",
+                room_id=room.room_id,
                 anchor_name=room.anchor_name,
-                room_id=room.room_id
+                room_title=room.room_title,
+                room_url=room.room_url
             )
 
-            message = MessageChain().message(msg_text)
-
             subs = await self._get_subs()
             sids = subs.get(room_id, {}).get("sids", [])
 
-            for sid in sids:
-                try:
-                    logger.debug(message.get_plain_text(True))
-                    await self.context.send_message(sid, message)
-                    logger.info(f"已向会话 {sid} 发送 {room.anchor_name} 下播通知")
-                except Exception as e:
-                    logger.error(f"向会话 {sid} 发送下播通知失败: {e}")
+            if self.digest_enable:
+                await self._queue_digest(sids, "end", room)
+                logger.info(f"直播间{room_id}({room.anchor_name})已下播，通知已加入汇总队列")
+            else:
+                await self._send_to_sids(sids, self._build_live_end_payload(self._room_snapshot(room)), f"{room.anchor_name} 下播通知")
+                logger.info(f"直播间{room_id}({room.anchor_name})已下播")
+
+        elif result["title_changed"] and room.last_status == 1:
+            self.event_hub.publish(
+                "title_change",
+                room_id=room.room_id,
+                anchor_name=room.anchor_name,
+                old_title=result["old_title"],
+                room_title=room.room_title,
+                room_url=room.room_url
+            )
+
+            subs = await self._get_subs()
+            title_sids = subs.get(room_id, {}).get("title_sids", [])
+            if title_sids:
+                msg_text = MessageTemplates.msg_title_change.render(
+                    anchor_name=room.anchor_name,
+                    old_title=result["old_title"],
+                    room_title=room.room_title,
+                    room_url=room.room_url,
+                    room_id=room.room_id
+                )
+                await self._send_to_sids(title_sids, NotificationPayload(msg_text), f"{room.anchor_name} 标题变更通知")
 
-            logger.info(f"直播间{room_id}({room.anchor_name})已下播")
+            logger.info(f"直播间{room_id}({room.anchor_name})标题变更: {result['old_title']} -> {room.room_title}")
 
         return result
 
     async def monitor_task(self):
         while self.running:
             logger.debug("执行直播间监控任务")
+            self._cycle_running = True
             for room_id, room in list(self.rooms.items()):
                 try:
                     await self.update_and_notify_room(room_id, room)
                 except Exception as e:
                     logger.error(f"更新直播间 {room_id} 出错: {str(e)}")
+            self._cycle_running = False
+
+            try:
+                await self._end_digest_cycle()
+            except Exception as e:
+                logger.error(f"发送汇总通知出错: {str(e)}")
 
             try:
                 await asyncio.sleep(self.check_interval)
@@ -175,6 +383,8 @@ class BilibiliLiveMonitor(Star):
         subs = await self._get_subs()
         if live_id in subs and sid in subs[live_id]["sids"]:
             subs[live_id]["sids"].remove(sid)
+            if sid in subs[live_id].get("title_sids", []):
+                subs[live_id]["title_sids"].remove(sid)
             if not subs[live_id]["sids"]:
                 del subs[live_id]
                 if live_id in self.rooms:
@@ -188,6 +398,40 @@ class BilibiliLiveMonitor(Star):
                 sid=sid, live_id=live_id
             ))
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("live_title_sub")
+    async def live_title_sub_command(self, event: AstrMessageEvent, sid: str, live_id: int):
+        """订阅直播中的标题变更通知。参数: sid 直播间ID"""
+        subs = await self._get_subs()
+        if live_id not in subs or sid not in subs[live_id]["sids"]:
+            yield event.plain_result(MessageTemplates.msg_title_sub_fail.render(
+                sid=sid, live_id=live_id
+            ))
+            return
+
+        title_sids = subs[live_id].setdefault("title_sids", [])
+        if sid not in title_sids:
+            title_sids.append(sid)
+            await self._save_subs(subs)
+        yield event.plain_result(MessageTemplates.msg_title_sub_success.render(
+            sid=sid, live_id=live_id
+        ))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("live_title_unsub")
+    async def live_title_unsub_command(self, event: AstrMessageEvent, sid: str, live_id: int):
+        subs = await self._get_subs()
+        if live_id in subs and sid in subs[live_id].get("title_sids", []):
+            subs[live_id]["title_sids"].remove(sid)
+            await self._save_subs(subs)
+            yield event.plain_result(MessageTemplates.msg_title_unsub_success.render(
+                sid=sid, live_id=live_id
+            ))
+        else:
+            yield event.plain_result(MessageTemplates.msg_unsub_fail.render(
+                sid=sid, live_id=live_id
+            ))
+
     async def get_live_info(self, room_id: Optional[int] = None):
         subs = await self._get_subs()
 
@@ -200,6 +444,7 @@ class BilibiliLiveMonitor(Star):
             sids_str = ", ".join(sids) if sids else "无"
             info += MessageTemplates.msg_sub_list.render(sids_str=sids_str)
 
+            await self._end_digest_outside_cycle()
             return info
         else:
             if not self.rooms:
@@ -214,6 +459,8 @@ class BilibiliLiveMonitor(Star):
                 info += MessageTemplates.msg_sub_list.render(sids_str=sids_str)
 
                 all_info.append(info)
+
+            await self._end_digest_outside_cycle()
             return MessageTemplates.msg_all_info_header.render() + "\n\n".join(all_info)
 
     @filter.permission_type(filter.PermissionType.ADMIN)
@@ -338,12 +585,14 @@ class BilibiliLiveMonitor(Star):
             yield event.plain_result(MessageTemplates.msg_qlamp_not_set.render())
             return
 
+        # 强制更新一次以获取最新状态；监控中的直播间需经过通知流程，避免吞掉状态或标题变化
         room = self.rooms.get(live_id)
-        if not room:
+        if room:
+            await self.update_and_notify_room(live_id, room)
+            await self._end_digest_outside_cycle()
+        else:
             room = BilibiliLiveRoom(live_id, str(live_id))
-
-        # 强制更新一次以获取最新状态
-        await room.update_info()
+            await room.update_info()
 
         if room.last_status != 1 or not room.live_start_time:
             yield event.plain_result(MessageTemplates.msg_qlamp_not_live.render(live_id=live_id))
@@ -382,5 +631,20 @@ class BilibiliLiveMonitor(Star):
 
     async def terminate(self):
         self.running = False
+        # 等待进行中的汇总发送完成，避免已取出的通知丢失
+        self._digest_wake.set()
+        if self._digest_flush_task and not self._digest_flush_task.done():
+            await self._digest_flush_task
+        if self._digest_pending:
+            try:
+                await self._flush_digest()
+            except Exception as e:
+                logger.error(f"发送汇总通知出错: {str(e)}")
+        for output in self.event_outputs:
+            try:
+                await output.stop()
+            except Exception as e:
+                logger.error(f"关闭事件输出 {type(output).__name__} 失败: {str(e)}")
+        BilibiliLiveRoom.set_recorder(None)
         await BilibiliLiveRoom.close_session()
         logger.info("直播间监控插件已停止")
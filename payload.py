@@ -0,0 +1,43 @@
+import base64
+import os
+from typing import Optional
+
+from astrbot.api import logger
+from astrbot.api.event import MessageChain
+
+# 这些平台适配器发送图片时会调用 Image.convert_to_base64()，本地文件图片每发送一次就要重新读取并编码一次；
+# 其余适配器大多调用 convert_to_file_path()，直接使用本地文件即可，提供 base64 反而会每次写出临时文件
+BASE64_IMAGE_PLATFORMS = frozenset({"aiocqhttp", "webchat", "satori", "wecom_ai_bot"})
+
+
+class NotificationPayload:
+    """一次通知的预渲染内容，按平台所需的图片形式缓存消息链，供同类平台的所有接收会话复用"""
+
+    def __init__(self, text: str, cover_path: Optional[str] = None, cover_fail_text: Optional[str] = None):
+        self.text = text
+        self.cover_path = cover_path if cover_path and os.path.exists(cover_path) else None
+        self.cover_fail_text = cover_fail_text
+        self._chains: dict[bool, MessageChain] = {}
+
+    def chain_for(self, use_base64: bool) -> MessageChain:
+        """获取消息链；use_base64 为真时封面只读取并编码一次"""
+        use_base64 = use_base64 and self.cover_path is not None
+        chain = self._chains.get(use_base64)
+        if chain is not None:
+            return chain
+
+        chain = MessageChain().message(self.text)
+        if self.cover_path is None:
+            if self.cover_fail_text:
+                chain.message(self.cover_fail_text)
+        elif use_base64:
+            try:
+                with open(self.cover_path, "rb") as f:
+                    chain.base64_image(base64.b64encode(f.read()).decode())
+            except OSError as e:
+                logger.error(f"读取封面 {self.cover_path} 失败，改用文件发送: {str(e)}")
+                chain.file_image(self.cover_path)
+        else:
+            chain.file_image(self.cover_path)
+        self._chains[use_base64] = chain
+        return chain
@@ -0,0 +1,173 @@
+import asyncio
+import base64
+import cProfile
+import gzip
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from typing import Optional
+
+from astrbot.api import logger
+
+
+def _open_trace(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TrafficRecorder:
+    """将 B 站接口的原始响应按时间顺序记录为 JSON Lines 轨迹文件（.gz 结尾时自动压缩）
+
+    每行字段: t 时间戳, k 请求类型, r 房间号, l 耗时(秒), 以及 d 响应 JSON / b base64 二进制 / e 错误信息
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = _open_trace(path, "a")
+        logger.info(f"B站接口流量记录已开启: {path}")
+
+    def record(self, kind: str, room_id: int, data=None, elapsed: float = 0.0, error: Optional[str] = None):
+        entry = {"t": round(time.time(), 3), "k": kind, "r": room_id, "l": round(elapsed, 3)}
+        if error is not None:
+            entry["e"] = error
+        elif isinstance(data, bytes):
+            entry["b"] = base64.b64encode(data).decode()
+        else:
+            entry["d"] = data
+        try:
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+        except Exception as e:
+            logger.error(f"写入流量记录失败: {str(e)}")
+
+    def close(self):
+        try:
+            self._file.close()
+        except Exception as e:
+            logger.error(f"关闭流量记录文件失败: {str(e)}")
+
+
+class TrafficReplayer:
+    """按房间和请求类型依次回放轨迹中的响应，并按加速倍率模拟原始接口耗时"""
+
+    def __init__(self, entries: list[dict], speed: float = 60.0):
+        self.entries = sorted(entries, key=lambda e: e["t"])
+        self.speed = max(speed, 1e-6)
+        self._queues: dict[tuple[str, int], deque] = defaultdict(deque)
+        for entry in self.entries:
+            self._queues[(entry["k"], int(entry["r"]))].append(entry)
+
+    @classmethod
+    def load(cls, path: str, speed: float = 60.0) -> "TrafficReplayer":
+        entries = []
+        with _open_trace(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+        return cls(entries, speed)
+
+    async def take(self, kind: str, room_id: int):
+        queue = self._queues.get((kind, int(room_id)))
+        if not queue:
+            raise LookupError(f"轨迹中没有更多直播间{room_id}的 {kind} 响应")
+        entry = queue.popleft()
+        if entry.get("l"):
+            await asyncio.sleep(entry["l"] / self.speed)
+        if "e" in entry:
+            raise RuntimeError(entry["e"])
+        if "b" in entry:
+            return base64.b64decode(entry["b"])
+        return entry.get("d")
+
+    def poll_points(self) -> list[dict]:
+        """每条 room_init 记录对应一次轮询"""
+        return [e for e in self.entries if e["k"] == "room_init"]
+
+
+async def replay_trace(path: str, speed: float = 60.0, monitor=None,
+                       profile_path: Optional[str] = None, trace_malloc: bool = False) -> dict:
+    """以加速倍率回放轨迹文件，驱动 BilibiliLiveRoom（或传入的 BilibiliLiveMonitor）走完整的轮询热路径。
+
+    回放使用独立创建的直播间实例，不影响进程内其他直播间的请求与状态。
+    传入 monitor 时通过 update_and_notify_room 回放，通知将经由 monitor.context 发出，
+    因此 monitor 必须是未加载运行的独立实例（通常配合测试用的 context 构造），正在运行监控任务的实例会被拒绝；
+    profile_path 不为空时保存 cProfile 统计，trace_malloc 为真时记录内存分配峰值与热点。
+    """
+    from .bilibili import BilibiliLiveRoom
+
+    if monitor is not None and getattr(monitor, "_monitor_task", None) is not None:
+        raise RuntimeError("不能对已启动监控任务的插件实例进行回放，请传入独立构造的 BilibiliLiveMonitor")
+
+    replayer = TrafficReplayer.load(path, speed)
+    anchor_names = {r_id: r.anchor_name for r_id, r in monitor.rooms.items()} if monitor is not None else {}
+    rooms = {}
+    summary = {"polls": 0, "live": 0, "offline": 0, "failed": 0}
+
+    profiler = cProfile.Profile() if profile_path else None
+
+    # 以轨迹时间作为房间状态机的时钟，使下播宽限期在加速回放下保持一致
+    clock = {"t": 0.0}
+    started = time.perf_counter()
+    try:
+        if trace_malloc:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        last_t = None
+        # monitor_task 每轮依次检查各直播间一次，直播间再次出现即视为新一轮开始
+        cycle_rooms = set()
+        for point in replayer.poll_points():
+            if last_t is not None and point["t"] > last_t:
+                await asyncio.sleep((point["t"] - last_t) / replayer.speed)
+            last_t = clock["t"] = point["t"]
+
+            room_id = int(point["r"])
+            if monitor is not None and room_id in cycle_rooms:
+                await monitor._end_digest_cycle()
+                cycle_rooms.clear()
+            cycle_rooms.add(room_id)
+
+            room = rooms.get(room_id)
+            if room is None:
+                room = rooms[room_id] = BilibiliLiveRoom(room_id, anchor_names.get(room_id, str(room_id)))
+                room.attach_replayer(replayer, lambda: clock["t"])
+
+            if monitor is not None:
+                result = await monitor.update_and_notify_room(room_id, room)
+            else:
+                result = await room.update_info()
+
+            summary["polls"] += 1
+            if not result:
+                summary["failed"] += 1
+            elif result["is_new_live"]:
+                summary["live"] += 1
+            elif result["is_new_offline"]:
+                summary["offline"] += 1
+
+        if monitor is not None and cycle_rooms:
+            await monitor._end_digest_cycle()
+    finally:
+        if profiler:
+            profiler.disable()
+        summary["elapsed"] = round(time.perf_counter() - started, 3)
+
+        if trace_malloc and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            summary["peak_memory"] = peak
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:10]:
+                logger.info(f"内存热点: {stat}")
+            tracemalloc.stop()
+        if profiler:
+            profiler.dump_stats(profile_path)
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(20)
+            logger.info(f"回放性能统计:\n{stream.getvalue()}")
+
+    logger.info(f"轨迹回放完成: {summary}")
+    return summary
@@ -24,6 +24,13 @@ class MessageTemplates:
     msg_all_info_header: MessageTemplate
     msg_sub_list: MessageTemplate
     msg_cover_fail: MessageTemplate
+    msg_live_digest_header: MessageTemplate
+    msg_live_digest_live_item: MessageTemplate
+    msg_live_digest_end_item: MessageTemplate
+    msg_title_change: MessageTemplate
+    msg_title_sub_success: MessageTemplate
+    msg_title_sub_fail: MessageTemplate
+    msg_title_unsub_success: MessageTemplate
     
     # Qlamp Templates
     msg_qlamp_set_success: MessageTemplate
@@ -143,6 +150,38 @@ class MessageTemplates:
             template_str=config.get("msg_cover_fail", None),
             default_template="<获取封面失败>"
         )
+        cls.msg_live_digest_header = MessageTemplates.MessageTemplate(
+            template_str=config.get("msg_live_digest_header", None),
+            default_template="直播动态汇总（共 {count} 条）："
+        )
+        cls.msg_live_digest_live_item = MessageTemplates.MessageTemplate(
+            template_str=config.get("msg_live_digest_live_item", None),
+            default_template="\n\n🔴 {anchor_name} 开播了喵！\n标题：{room_title}\n传送门: {room_url}"
+        )
+        cls.msg_live_digest_end_item = MessageTemplates.MessageTemplate(
+            template_str=config.get("msg_live_digest_end_item", None),
+            default_template="\n\n⚪ {anchor_name} 的直播已结束喵。"
+        )
+        cls.msg_title_change = MessageTemplates.MessageTemplate(
+            template_str=config.get("msg_title_change", None),
+            default_template=(
+                "{anchor_name} 修改了直播标题喵！\n"
+                "新标题：{room_title}\n"
+                "传送门: {room_url}"
+            )
+        )
+        cls.msg_title_sub_success = MessageTemplates.MessageTemplate(
+            template_str=config.get("msg_title_sub_success", None),
+            default_template="已为会话 {sid} 开启直播间 {live_id} 的标题变更通知"
+        )
+        cls.msg_title_sub_fail = MessageTemplates.MessageTemplate(
+            template_str=config.get("msg_title_sub_fail", None),
+            default_template="会话 {sid} 尚未订阅直播间 {live_id}，请先使用 live_sub 订阅"
+        )
+        cls.msg_title_unsub_success = MessageTemplates.MessageTemplate(
+            template_str=config.get("msg_title_unsub_success", None),
+            default_template="已关闭会话 {sid} 对直播间 {live_id} 的标题变更通知"
+        )
         cls.msg_qlamp_set_success = MessageTemplates.MessageTemplate(
             template_str=config.get("msg_qlamp_set_success", None),
             default_template="已将本会话的默认切片直播间设置为 {live_id}"